@@ -0,0 +1,54 @@
+"""Firefly synchronization experiment: Kuramoto versus IRE phase oscillators."""
+from .firefly import (
+    INTEGRATORS,
+    METRIC_OBSERVERS,
+    EntropyObserver,
+    FlashEventLog,
+    FlashHistory,
+    InformationFlowObserver,
+    MetricObserver,
+    MetricPipeline,
+    MetricSnapshot,
+    MultiScaleSyncObserver,
+    NeighborhoodStateBuffer,
+    PredictabilityObserver,
+    RecoveryObserver,
+    RunProfiler,
+    TrajectoryRecorder,
+    WhitePaperFireflyEnsemble,
+    WhitePaperFireflyExperiment,
+    benchmark_integrators,
+    binary_mutual_information,
+    binary_transfer_entropy,
+    main,
+    peak_rss_bytes,
+    to_jsonable,
+    validate_precision,
+)
+
+__all__ = [
+    'INTEGRATORS',
+    'METRIC_OBSERVERS',
+    'EntropyObserver',
+    'FlashEventLog',
+    'FlashHistory',
+    'InformationFlowObserver',
+    'MetricObserver',
+    'MetricPipeline',
+    'MetricSnapshot',
+    'MultiScaleSyncObserver',
+    'NeighborhoodStateBuffer',
+    'PredictabilityObserver',
+    'RecoveryObserver',
+    'RunProfiler',
+    'TrajectoryRecorder',
+    'WhitePaperFireflyEnsemble',
+    'WhitePaperFireflyExperiment',
+    'benchmark_integrators',
+    'binary_mutual_information',
+    'binary_transfer_entropy',
+    'main',
+    'peak_rss_bytes',
+    'to_jsonable',
+    'validate_precision',
+]
@@ -0,0 +1,3 @@
+from .firefly import main
+
+main()
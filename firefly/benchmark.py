@@ -0,0 +1,203 @@
+"""Scaling benchmark of the firefly simulation and analysis pipeline.
+
+Every (n_fireflies, duration) point runs in its own fresh process with a fixed seed,
+one point at a time, and reports steps per second, the time spent in the analysis
+methods, the per-phase step profile and the process peak RSS. Results are written
+as a JSON baseline; --compare checks a new run (or a --current file) against one and
+flags every metric that got worse by more than --tolerance.
+
+Example:
+    python -m firefly.benchmark --preset smoke --output before.json
+    python -m firefly.benchmark --preset smoke --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from firefly import WhitePaperFireflyExperiment, peak_rss_bytes, to_jsonable
+
+PRESETS = {
+    'smoke': {'n_fireflies': [100, 500], 'durations': [10.0]},
+    'default': {'n_fireflies': [100, 1000, 5000], 'durations': [10.0, 60.0]},
+    'full': {'n_fireflies': [100, 1000, 5000, 20000, 50000], 'durations': [10.0, 60.0, 600.0]},
+}
+
+# Metric -> True when larger is better; the ones compared against a baseline
+COMPARED_METRICS = {
+    'steps_per_second': True,
+    'simulation_time': False,
+    'analyze_results_time': False,
+    'white_paper_analysis_time': False,
+    'peak_rss_bytes': False,
+}
+
+
+def run_point(n_fireflies, duration, seed=0, backend='numpy', dt=0.01):
+    """Simulate and analyze one point quietly, returning its timings and peak RSS"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        experiment = WhitePaperFireflyExperiment(n_fireflies=n_fireflies, duration=duration, dt=dt, seed=seed)
+        experiment.backend = backend
+        profiler = experiment.enable_profiling()
+        setup_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        experiment.run_simulation()
+        simulation_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        experiment.analyze_results()
+        analyze_results_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        experiment.white_paper_analysis()
+        white_paper_analysis_time = time.perf_counter() - start
+    
+    profile = profiler.summary()
+    return {
+        'n_fireflies': n_fireflies,
+        'duration': duration,
+        'steps': experiment.steps,
+        'setup_time': setup_time,
+        'simulation_time': simulation_time,
+        'steps_per_second': experiment.steps / simulation_time,
+        'analyze_results_time': analyze_results_time,
+        'white_paper_analysis_time': white_paper_analysis_time,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'peak_array_bytes': profile['peak_array_bytes'],
+        'phases': {phase: stats['total'] for phase, stats in profile['phases'].items()},
+        'counters': profile['counters'],
+        'final_order': [experiment.order_kuramoto[-1], experiment.order_ire[-1]],
+    }
+
+
+def run_isolated(n_fireflies, duration, **kwargs):
+    """run_point in a fresh spawned process, so peak RSS and caches belong to this point alone"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        try:
+            return pool.submit(run_point, n_fireflies, duration, **kwargs).result()
+        except BrokenProcessPool:
+            # Typically killed for running out of memory
+            return {'n_fireflies': n_fireflies, 'duration': duration, 'error': 'worker process died'}
+
+
+def environment():
+    """Machine and code version the numbers were taken on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run_benchmark(n_fireflies, durations, seed=0, backend='numpy'):
+    """Benchmark every (n_fireflies, duration) point in turn; returns the JSON-ready results"""
+    points = []
+    for duration in durations:
+        for n in n_fireflies:
+            result = run_isolated(n, duration, seed=seed, backend=backend)
+            points.append(to_jsonable(result))
+            if 'error' in result:
+                print(f"  N={n:>6} T={duration:>6.0f}s  failed: {result['error']}")
+            else:
+                print(f"  N={n:>6} T={duration:>6.0f}s  {result['steps_per_second']:9.1f} steps/s  "
+                      f"analysis {result['white_paper_analysis_time']:7.2f}s  "
+                      f"peak RSS {result['peak_rss_bytes'] / 2**20:8.1f} MiB")
+    return {
+        'environment': environment(),
+        'settings': {'seed': seed, 'backend': backend},
+        'points': points,
+    }
+
+
+def compare_results(baseline, current, tolerance=0.1, min_time=0.05):
+    """Metrics of the points both runs share that got worse by more than `tolerance`
+    
+    Timings where both values are under `min_time` seconds are too noisy to compare
+    and are skipped. Returns one record per regression with the point, metric, both
+    values and the relative change (positive means worse).
+    """
+    baseline_points = {(p['n_fireflies'], p['duration']): p for p in baseline['points'] if 'error' not in p}
+    regressions = []
+    for point in current['points']:
+        reference = baseline_points.get((point['n_fireflies'], point['duration']))
+        if reference is None or 'error' in point:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = reference.get(metric), point.get(metric)
+            if not old or new is None:
+                continue
+            if metric.endswith('_time') and max(old, new) < min_time:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > tolerance:
+                regressions.append({
+                    'n_fireflies': point['n_fireflies'], 'duration': point['duration'],
+                    'metric': metric, 'baseline': old, 'current': new, 'change': change,
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the firefly simulation and analysis")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='default')
+    parser.add_argument('--n-fireflies', type=int, nargs='+', default=None, help="Override the preset sizes")
+    parser.add_argument('--durations', type=float, nargs='+', default=None, help="Override the preset durations")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', choices=['numpy', 'numba'], default='numpy')
+    parser.add_argument('--output', default=None, help="Write the results as a JSON baseline here")
+    parser.add_argument('--compare', default=None, help="Baseline JSON to check the results against")
+    parser.add_argument('--current', default=None, help="Compare this results file instead of running")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed relative slowdown (0.1 = 10%%)")
+    parser.add_argument('--min-time', type=float, default=0.05, help="Ignore timings shorter than this (seconds)")
+    args = parser.parse_args(argv)
+    
+    if args.current:
+        with open(args.current) as f:
+            results = json.load(f)
+    else:
+        preset = PRESETS[args.preset]
+        n_fireflies = args.n_fireflies or preset['n_fireflies']
+        durations = args.durations or preset['durations']
+        print(f"Benchmark: N={n_fireflies}, durations={durations}, seed={args.seed}, backend={args.backend}")
+        results = run_benchmark(n_fireflies, durations, seed=args.seed, backend=args.backend)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, tolerance=args.tolerance, min_time=args.min_time)
+        for r in regressions:
+            print(f"REGRESSION N={r['n_fireflies']} T={r['duration']:.0f}s {r['metric']}: "
+                  f"{r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.1%} worse)")
+        if not regressions:
+            print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Parameter sweeps over WhitePaperFireflyExperiment on a process pool.
+
+Each (parameters, seed) run stores its white_paper_analysis output as JSON in a
+cache directory keyed by a hash of both, so interrupted sweeps resume and repeated
+points are served from disk.
+
+Example:
+    python sweep.py --grid k_ire=0.4,0.8,1.2 --grid gamma_ire=0.03,0.06 --seeds 0 1 2
+"""
+import argparse
+import contextlib
+import hashlib
+import inspect
+import io
+import itertools
+import json
+import multiprocessing
+import numbers
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from firefly import WhitePaperFireflyExperiment, to_jsonable
+
+# Parameters taken by the constructor; everything else is set as an attribute
+CONSTRUCTOR_PARAMS = set(inspect.signature(WhitePaperFireflyExperiment.__init__).parameters) - {'self', 'seed'}
+
+
+def parameter_grid(grid):
+    """Expand {name: [values]} into the list of all parameter combinations"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def canonical(value):
+    """value with every number (bools aside) as a float, so k_ire=1 and k_ire=1.0 hash alike"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if isinstance(value, dict):
+        return {name: canonical(v) for name, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    return value
+
+
+def cache_key(params, seed):
+    """Content hash of a run's parameters and seed"""
+    payload = json.dumps({'params': canonical(params), 'seed': seed}, sort_keys=True, default=float)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_point(params, seed):
+    """Simulate and analyze one parameter point quietly, returning JSON-ready metrics"""
+    constructor_args = {k: v for k, v in params.items() if k in CONSTRUCTOR_PARAMS}
+    with contextlib.redirect_stdout(io.StringIO()):
+        experiment = WhitePaperFireflyExperiment(seed=seed, **constructor_args)
+        for name, value in params.items():
+            if name in CONSTRUCTOR_PARAMS:
+                continue
+            if not hasattr(experiment, name):
+                raise ValueError(f"Unknown experiment parameter: {name}")
+            setattr(experiment, name, value)
+        # Vision parameters shape the initial interaction graph
+        experiment.update_visibility()
+        experiment.run_simulation()
+        return to_jsonable(experiment.white_paper_analysis())
+
+
+def load_cached(cache_dir, key):
+    path = os.path.join(cache_dir, f'{key}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def store_cached(cache_dir, key, record):
+    # Write then rename, so an interrupted sweep never leaves a partial entry
+    path = os.path.join(cache_dir, f'{key}.json')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(grid, seeds=(0,), base_params=None, cache_dir='sweep_cache', max_workers=None):
+    """Run every grid point for every seed, in parallel, reusing cached results
+    
+    Returns one record per (point, seed) with 'params', 'seed' and 'results' keys,
+    in grid order. Runs that share a cache key are simulated once. A failing run does
+    not stop the others: every successful run is cached, then a RuntimeError reports
+    the failures.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    points = [dict(base_params or {}, **point) for point in parameter_grid(grid)]
+    runs = [(params, int(seed)) for params in points for seed in seeds]
+    
+    records = {}
+    pending = []
+    seen = set()
+    for params, seed in runs:
+        key = cache_key(params, seed)
+        if key in seen:
+            continue  # e.g. k_ire=1 and k_ire=1.0
+        seen.add(key)
+        cached = load_cached(cache_dir, key)
+        if cached is not None:
+            records[key] = cached
+        else:
+            pending.append((key, params, seed))
+    print(f"Sweep: {len(runs)} runs, {len(records)} cached, {len(pending)} to simulate")
+    
+    failures = []
+    if pending:
+        # Spawned, not forked: a forked worker hangs on exit once numba's threads run here
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            futures = {pool.submit(run_point, params, seed): (key, params, seed)
+                       for key, params, seed in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                key, params, seed = futures[future]
+                try:
+                    results = future.result()
+                except Exception as error:
+                    failures.append((params, seed, error))
+                    print(f"  [{done}/{len(pending)}] {params} seed={seed} failed: {error!r}")
+                    continue
+                record = {'params': params, 'seed': seed, 'results': results}
+                store_cached(cache_dir, key, record)
+                records[key] = record
+                print(f"  [{done}/{len(pending)}] {params} seed={seed}")
+    
+    if failures:
+        details = '; '.join(f"{params} seed={seed}: {error!r}" for params, seed, error in failures)
+        raise RuntimeError(f"{len(failures)} of {len(pending)} sweep runs failed "
+                           f"(the others are cached): {details}") from failures[0][2]
+    return [records[cache_key(params, seed)] for params, seed in runs]
+
+
+def parse_grid_arg(text):
+    """Parse 'name=v1,v2,...' into (name, [values]) with numeric values where possible"""
+    name, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"Expected name=v1,v2,... but got {text!r}")
+    parsed = []
+    for value in values.split(','):
+        try:
+            parsed.append(int(value))
+        except ValueError:
+            parsed.append(float(value))
+    return name.strip(), parsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cached parallel parameter sweep of the firefly experiment")
+    parser.add_argument('--grid', type=parse_grid_arg, action='append', default=[],
+                        help="Parameter values as name=v1,v2,... (repeatable)")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--n-fireflies', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=120.0)
+    parser.add_argument('--dt', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--cache', default='sweep_cache', help="Result cache directory")
+    parser.add_argument('--output', default=None, help="Write all records to this JSON file")
+    args = parser.parse_args(argv)
+    
+    base_params = {'n_fireflies': args.n_fireflies, 'duration': args.duration, 'dt': args.dt}
+    records = run_sweep(dict(args.grid), seeds=args.seeds, base_params=base_params,
+                        cache_dir=args.cache, max_workers=args.workers)
+    
+    for record in records:
+        order = record['results']['basic_metrics']['order']
+        print(f"{record['params']} seed={record['seed']}: "
+              f"order Kuramoto={order[0]:.3f} IRE={order[1]:.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(records, f, indent=2)
+    return records
+
+
+if __name__ == "__main__":
+    main()
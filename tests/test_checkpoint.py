@@ -0,0 +1,79 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from firefly import WhitePaperFireflyExperiment
+from firefly.firefly import fork_perturbations
+
+
+def quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def test_forks_never_write_into_the_source_recording(tmp_path):
+    source_path = str(tmp_path / 'source')
+    experiment = WhitePaperFireflyExperiment(n_fireflies=30, duration=2.0, seed=0, record_path=source_path)
+    quiet(experiment.run_simulation, stop=100)
+    experiment.save_checkpoint(str(tmp_path / 'snapshot.npz'))
+    quiet(experiment.run_simulation)
+    source_positions = np.load(f'{source_path}/positions.npy').copy()
+    
+    forks = [quiet(WhitePaperFireflyExperiment.load_checkpoint, str(tmp_path / 'snapshot.npz'), seed=seed)
+             for seed in (1, 2)]
+    for fork in forks:
+        quiet(fork.run_simulation)
+        assert fork.recorder.path is None
+    
+    np.testing.assert_array_equal(np.load(f'{source_path}/positions.npy'), source_positions)
+    # Both forks keep the shared prefix and then follow their own streams
+    a, b = (fork.recorder.arrays['positions'] for fork in forks)
+    np.testing.assert_array_equal(a[:100], source_positions[:100])
+    np.testing.assert_array_equal(b[:100], source_positions[:100])
+    assert not np.array_equal(a[100:], b[100:])
+
+
+def test_fork_perturbations_record_each_fork_separately(tmp_path):
+    source_path = str(tmp_path / 'source')
+    experiment = WhitePaperFireflyExperiment(n_fireflies=30, duration=2.0, seed=0, record_path=source_path)
+    quiet(experiment.run_simulation, stop=100)
+    experiment.save_checkpoint(str(tmp_path / 'snapshot.npz'))
+    source_positions = np.load(f'{source_path}/positions.npy').copy()
+    
+    quiet(fork_perturbations, str(tmp_path / 'snapshot.npz'),
+          [{'seed': 1}, {'perturbation_fraction': 0.5}], record_dir=str(tmp_path / 'forks'))
+    np.testing.assert_array_equal(np.load(f'{source_path}/positions.npy'), source_positions)
+    for i in range(2):
+        fork_positions = np.load(str(tmp_path / 'forks' / f'fork_{i}' / 'positions.npy'))
+        np.testing.assert_array_equal(fork_positions[:100], source_positions[:100])
+
+
+@pytest.mark.parametrize('integrator', ['euler', 'adaptive'])
+def test_resuming_a_checkpoint_is_bit_exact(tmp_path, integrator):
+    full = WhitePaperFireflyExperiment(n_fireflies=60, duration=3.0, seed=5, record_stride=7)
+    full.integrator = integrator
+    quiet(full.run_simulation)
+    part = WhitePaperFireflyExperiment(n_fireflies=60, duration=3.0, seed=5, record_stride=7)
+    part.integrator = integrator
+    quiet(part.run_simulation, stop=130)
+    part.save_checkpoint(str(tmp_path / 'snapshot.npz'))
+    resumed = quiet(WhitePaperFireflyExperiment.load_checkpoint, str(tmp_path / 'snapshot.npz'))
+    # The adaptive integrator carries on with the substep size it had reached
+    assert resumed.adaptive_substep == part.adaptive_substep
+    quiet(resumed.run_simulation)
+    assert resumed.adaptive_substeps == full.adaptive_substeps
+    
+    for name in WhitePaperFireflyExperiment.checkpoint_arrays:
+        expected, actual = getattr(full, name), getattr(resumed, name)
+        if sparse.issparse(expected):
+            assert (expected != actual).nnz == 0, name
+        else:
+            np.testing.assert_array_equal(actual, expected, err_msg=name)
+    for name in ('flash_events_kuramoto', 'flash_events_ire'):
+        expected, actual = getattr(full, name), getattr(resumed, name)
+        np.testing.assert_array_equal(actual.events[:len(actual)], expected.events[:len(expected)])
+    for name, values in full.recorder.arrays.items():
+        np.testing.assert_array_equal(resumed.recorder.arrays[name], values, err_msg=name)
@@ -0,0 +1,25 @@
+import pytest
+
+from firefly.firefly import build_experiment, build_parser, selected_metrics
+
+
+@pytest.mark.parametrize('command', ['analyze', 'render'])
+def test_analysis_commands_default_to_all_metrics(command):
+    args = build_parser().parse_args([command, '--n-fireflies', '20', '--duration', '1'])
+    assert selected_metrics(args) is None
+    experiment = build_experiment(args)
+    assert all(observer.enabled for observer in experiment.observers.values())
+
+
+def test_simulate_defaults_to_no_metrics():
+    args = build_parser().parse_args(['simulate', '--n-fireflies', '20', '--duration', '1'])
+    assert selected_metrics(args) == ['none']
+    experiment = build_experiment(args)
+    assert not any(observer.enabled for observer in experiment.observers.values())
+
+
+def test_explicit_metrics_override_the_command_default():
+    args = build_parser().parse_args(['simulate', '--metrics', 'entropy'])
+    assert selected_metrics(args) == ['entropy']
+    args = build_parser().parse_args(['analyze', '--metrics', 'none'])
+    assert selected_metrics(args) == ['none']
@@ -0,0 +1,39 @@
+import contextlib
+import io
+
+import numpy as np
+
+from firefly import WhitePaperFireflyEnsemble
+
+
+def run(**settings):
+    ensemble = WhitePaperFireflyEnsemble(n_replicas=3, n_fireflies=20, duration=1.0, seed=0)
+    for name, value in settings.items():
+        setattr(ensemble, name, value)
+    ensemble.update_visibility()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ensemble.run_simulation()
+    return ensemble
+
+
+def test_ensemble_follows_the_experiment_visibility_modes():
+    periodic = run()
+    assert periodic.visibility_mode == 'periodic'
+    # Construction, the explicit rebuild above, then one rebuild every interval steps
+    assert periodic.visibility_rebuilds == 2 + periodic.steps // periodic.visibility_update_interval()
+    verlet = run(visibility_mode='verlet')
+    assert verlet.visibility_rebuilds < periodic.visibility_rebuilds
+
+
+def test_ensemble_uses_the_selected_integrator():
+    euler, rk4 = run(), run(integrator='rk4')
+    assert not np.array_equal(euler.order_ire, rk4.order_ire)
+    np.testing.assert_allclose(euler.order_ire, rk4.order_ire, atol=0.05)
+
+
+def test_ensemble_reports_information_metrics_per_replica():
+    summary = run().summary()
+    for name in ('information_flow', 'entropy', 'predictability'):
+        kuramoto, ire = summary[name]
+        assert kuramoto.shape == ire.shape == (3,)
+        assert np.all(np.isfinite(ire))
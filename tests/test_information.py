@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from firefly import binary_mutual_information
+
+metrics = pytest.importorskip('sklearn.metrics')
+
+
+def test_binary_mutual_information_matches_sklearn():
+    rng = np.random.RandomState(0)
+    past = rng.random_sample((6, 200)) < 0.3
+    # Rows from independent to fully dependent, plus a constant row
+    present = np.where(rng.random_sample((6, 200)) < np.linspace(0, 1, 6)[:, np.newaxis], past, ~past)
+    present[-1] = True
+    
+    expected = [metrics.mutual_info_score(p, q) for p, q in zip(past, present)]
+    np.testing.assert_allclose(binary_mutual_information(past, present), expected, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(binary_mutual_information(past[0], present[0]), expected[0], rtol=1e-12)
@@ -0,0 +1,38 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from firefly import WhitePaperFireflyExperiment
+
+pytest.importorskip('numba')
+
+
+@pytest.mark.parametrize('mode', ['periodic', 'verlet'])
+def test_fused_kernel_matches_the_numpy_step(mode):
+    runs = {}
+    for backend in ('numpy', 'numba'):
+        experiment = WhitePaperFireflyExperiment(n_fireflies=100, duration=2.0, seed=0)
+        experiment.visibility_mode = mode
+        experiment.backend = backend
+        experiment.advance(0, experiment.steps)
+        runs[backend] = experiment
+    numpy_run, numba_run = runs['numpy'], runs['numba']
+    
+    # The kernel sums the mean field and order parameters in a different order
+    for name in ('phases_kuramoto', 'phases_ire', 'positions', 'order_kuramoto', 'order_ire'):
+        np.testing.assert_allclose(getattr(numba_run, name), getattr(numpy_run, name), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(numba_run.windings_kuramoto, numpy_run.windings_kuramoto)
+    np.testing.assert_array_equal(numba_run.windings_ire, numpy_run.windings_ire)
+    assert len(numba_run.flash_events_ire) == len(numpy_run.flash_events_ire)
+    assert numba_run.visibility_rebuilds == numpy_run.visibility_rebuilds
+
+
+def test_backend_fallback_warns_once_per_run():
+    experiment = WhitePaperFireflyExperiment(n_fireflies=20, duration=1.0, seed=0)
+    experiment.backend = 'numba'
+    experiment.integrator = 'rk4'
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        experiment.advance(0, experiment.steps)
+    assert len(caught) == 1
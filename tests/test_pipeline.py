@@ -0,0 +1,30 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from firefly import WhitePaperFireflyExperiment
+
+METRICS = ['information_flow_kuramoto', 'information_flow_ire', 'entropy_kuramoto', 'entropy_ire',
+           'predictability_kuramoto', 'predictability_ire', 'local_sync_ire',
+           'global_sync_ire', 'order_ire']
+
+
+def run(analysis_workers, queue_size=64, cadence=None):
+    experiment = WhitePaperFireflyExperiment(n_fireflies=60, duration=4.0, seed=0)
+    experiment.perturbation_time = 200
+    if cadence:
+        experiment.configure_metrics(None, cadence=cadence)
+    with contextlib.redirect_stdout(io.StringIO()):
+        experiment.run_simulation(analysis_workers=analysis_workers, queue_size=queue_size)
+    return experiment
+
+
+@pytest.mark.parametrize('cadence', [None, 5])
+@pytest.mark.parametrize('analysis_workers, queue_size', [(1, 64), (2, 1)])
+def test_pipelined_metrics_match_the_serial_run(analysis_workers, queue_size, cadence):
+    serial, pipelined = run(0, cadence=cadence), run(analysis_workers, queue_size, cadence)
+    for name in METRICS:
+        np.testing.assert_array_equal(getattr(pipelined, name), getattr(serial, name), err_msg=name)
+    assert pipelined.recovery_ire == serial.recovery_ire
@@ -0,0 +1,18 @@
+import sys
+
+import pytest
+
+from firefly import WhitePaperFireflyExperiment, peak_rss_bytes
+
+resource = pytest.importorskip('resource')
+
+
+@pytest.mark.parametrize('platform, scale', [('linux', 1024), ('darwin', 1)])
+def test_peak_rss_follows_the_platform_units(monkeypatch, platform, scale):
+    monkeypatch.setattr(sys, 'platform', platform)
+    assert peak_rss_bytes() == resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    
+    experiment = WhitePaperFireflyExperiment(n_fireflies=20, duration=0.5, seed=0)
+    profiler = experiment.enable_profiling()
+    experiment.advance(0, experiment.steps)
+    assert profiler.summary()['peak_rss_bytes'] == peak_rss_bytes()
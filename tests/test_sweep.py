@@ -0,0 +1,31 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+from firefly.sweep import run_sweep
+
+BASE = {'n_fireflies': 10, 'duration': 0.5}
+
+
+def sweep(grid, cache_dir):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        records = run_sweep(grid, base_params=BASE, cache_dir=str(cache_dir), max_workers=1)
+    return records, out.getvalue()
+
+
+def test_equal_parameter_values_are_simulated_once(tmp_path):
+    records, out = sweep({'k_ire': [1, 1.0]}, tmp_path)
+    assert '1 to simulate' in out
+    assert len(os.listdir(tmp_path)) == 1
+    assert records[0] == records[1]
+
+
+def test_a_failing_run_keeps_the_others(tmp_path):
+    # More disturbed fireflies than there are fails at the perturbation step
+    with pytest.raises(RuntimeError, match='1 of 2 sweep runs failed'):
+        sweep({'perturbation_fraction': [0.2, 5.0]}, tmp_path)
+    assert len(os.listdir(tmp_path)) == 1
+    records, out = sweep({'perturbation_fraction': [0.2]}, tmp_path)
+    assert '1 cached, 0 to simulate' in out
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from firefly import WhitePaperFireflyExperiment
+from firefly.firefly import visibility_candidates
+
+
+def candidate_pairs(experiment):
+    return set(zip(experiment.candidate_rows.tolist(), experiment.candidate_cols.tolist()))
+
+
+def expected_pairs(experiment, search_range):
+    return set(zip(*(x.tolist() for x in visibility_candidates(experiment.positions, search_range))))
+
+
+def test_changing_the_visibility_mode_rebuilds_the_candidates():
+    experiment = WhitePaperFireflyExperiment(n_fireflies=200, duration=1.0, seed=0)
+    assert candidate_pairs(experiment) == expected_pairs(experiment, experiment.vision_range)
+    
+    experiment.visibility_mode = 'verlet'
+    padded = expected_pairs(experiment, experiment.vision_range + experiment.verlet_skin)
+    assert candidate_pairs(experiment) == padded
+    experiment.verlet_skin = 3.0
+    assert candidate_pairs(experiment) == expected_pairs(experiment, experiment.vision_range + 3.0)
+    
+    experiment.visibility_mode = 'periodic'
+    assert candidate_pairs(experiment) == expected_pairs(experiment, experiment.vision_range)
+    with pytest.raises(ValueError):
+        experiment.visibility_mode = 'never'
+
+
+def test_visibility_mode_survives_a_checkpoint(tmp_path):
+    experiment = WhitePaperFireflyExperiment(n_fireflies=50, duration=1.0, seed=0)
+    experiment.visibility_mode = 'verlet'
+    experiment.save_checkpoint(str(tmp_path / 'snapshot.npz'))
+    restored = WhitePaperFireflyExperiment.load_checkpoint(str(tmp_path / 'snapshot.npz'))
+    assert restored.visibility_mode == 'verlet'
+    np.testing.assert_array_equal(restored.candidate_rows, experiment.candidate_rows)